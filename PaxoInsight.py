@@ -15,25 +15,25 @@ Drag & Drop alternatives:
 - PySimpleGUI abstraction with DnD on supported backends.
 
 All required libraries imported below:
-- os, shutil, gzip, zipfile, tarfile, py7zr, threading
+- os, sys, shutil, contextlib, gzip, py7zr, queue, subprocess, threading, itertools, collections, concurrent.futures
+- zipfile and tarfile, imported on first use so the window opens sooner
 - tkinter for UI, including scrolledtext, filedialog, messagebox
 - Optional TkinterDnD2 for Drag&Drop
+- Optional libarchive-c for faster tar-family extraction
 """
 
 import os
+import sys
 import shutil
+import contextlib
 import gzip
-import zipfile
-import tarfile
 import py7zr
+import queue
+import subprocess
 import threading
-import tkinter as tk
-from tkinter import filedialog, messagebox
-try:
-    from tkinter import scrolledtext
-except ImportError:
-    scrolledtext = None
-
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import tkinter as tk
 from tkinter import filedialog, messagebox
 try:
@@ -53,18 +53,120 @@ except ImportError:
     except ImportError:
         pass
 
+# Optional libarchive-c: its C reader runs outside the GIL (ctypes), so pool threads
+# decompress tar-family archives in parallel
+try:
+    import libarchive
+    if not hasattr(libarchive, 'file_reader'):
+        libarchive = None
+except (ImportError, OSError, AttributeError):
+    # OSError/AttributeError: the package is installed but the system libarchive is missing or too old
+    libarchive = None
+
 # Supported and special formats
 SUPPORTED_FORMATS = {
     '.zip': 'zip', '.7z': '7z', '.tar': 'tar', '.tar.gz': 'gztar', '.tgz': 'gztar',
     '.tar.bz2': 'bztar', '.tbz2': 'bztar', '.tar.xz': 'xztar', '.txz': 'xztar'
 }
-SPECIAL_EXTENSIONS = {'.jar', '.war', '.exe', '.dll', '.apk', '.ipa', '.so'}
+SPECIAL_EXTENSIONS = frozenset({'.jar', '.war', '.exe', '.dll', '.apk', '.ipa', '.so'})
 CLASS_EXTENSION = '.class'
-REPORT_EXTENSIONS = SPECIAL_EXTENSIONS.union({CLASS_EXTENSION, '.tar.gz', '.tar.bz2', '.tar.xz', '.gz'})
+REPORT_EXTENSIONS = SPECIAL_EXTENSIONS | {CLASS_EXTENSION, '.tar.gz', '.tar.bz2', '.tar.xz', '.gz'}
+# Extensions listed as special files by _scan_disk
+_SPECIALS_OR_GZ = SPECIAL_EXTENSIONS | {'.gz'}
+# Extensions the nested unpacker extracts
+_UNPACKABLE = _SPECIALS_OR_GZ.union(SUPPORTED_FORMATS)
 MAX_DEPTH = 5
+COPY_BUFSIZE = 1 << 20
+# Readahead requested up front per archive; bounded so pool threads don't pull whole archives in
+READAHEAD = 8 << 20
+# Inner-archive extraction threads; AEX_WORKERS overrides, e.g. 1 on slow disks where threads contend.
+# The default oversubscribes the cores twice: jobs alternate between disk waits and decompression
+try:
+    WORKERS = max(1, int(os.environ['AEX_WORKERS']))
+except (KeyError, ValueError):
+    WORKERS = min(32, (os.cpu_count() or 1) * 2)
+# Inode-ordered traversal helps ext4/HFS+ on spinning disks; APFS SSDs gain nothing and
+# DirEntry.inode() costs an extra stat per entry on Windows
+INODE_ORDER = sys.platform not in ('darwin', 'win32')
+# Native tar is only worth spawning when a multi-core decompressor can do the heavy lifting;
+# candidates are listed in order of preference
+_NATIVE = {name: shutil.which(name) for name in ('tar', 'pigz', 'lbzip2', 'pbzip2', 'pixz')}
+_NATIVE_DECOMPRESSORS = {
+    '.tar.gz': ('pigz',), '.tgz': ('pigz',),
+    '.tar.bz2': ('lbzip2', 'pbzip2'), '.tbz2': ('lbzip2', 'pbzip2'),
+    '.tar.xz': ('pixz',), '.txz': ('pixz',),
+}
 AUTHOR = 'DiamondGnom'
 VERSION = '0.3.0'
 
+def _build_ext_trie(exts):
+    """Build a trie of extensions keyed by reversed characters; None marks a complete extension."""
+    trie = {}
+    for ext in exts:
+        node = trie
+        for ch in reversed(ext):
+            node = node.setdefault(ch, {})
+        node[None] = ext
+    return trie
+
+# '.class' is included so one trie walk both finds archives and spots class files
+_EXT_TRIE = _build_ext_trie(_UNPACKABLE | {CLASS_EXTENSION})
+
+def _match_extension(lp):
+    """Return the longest known extension that lowered path lp ends with, or ''."""
+    node, found = _EXT_TRIE, ''
+    for ch in reversed(lp):
+        node = node.get(ch)
+        if node is None:
+            break
+        found = node.get(None, found)
+    return found
+
+def _suffix(name):
+    """Return the longest known extension of name, else its splitext extension, lowercased"""
+    lp = name.lower()
+    # Fallback to simple splitext
+    return _match_extension(lp) or os.path.splitext(lp)[1]
+
+# Characters ZipFile.extract replaces in member names on Windows
+_WIN_ILLEGAL = str.maketrans(':<>|"?*', '_______')
+
+# Header magic per extension as (offset, accepted prefixes); sniffed before extracting
+_ZIP_MAGIC = (b'PK\x03\x04', b'PK\x05\x06', b'PK\x07\x08')
+_GZ_MAGIC = (b'\x1f\x8b',)
+_BZ2_MAGIC = (b'BZh',)
+_XZ_MAGIC = (b'\xfd7zXZ\x00',)
+_ARCHIVE_MAGIC = {
+    '.gz': (0, _GZ_MAGIC), '.tar.gz': (0, _GZ_MAGIC), '.tgz': (0, _GZ_MAGIC),
+    '.tar.bz2': (0, _BZ2_MAGIC), '.tbz2': (0, _BZ2_MAGIC),
+    '.tar.xz': (0, _XZ_MAGIC), '.txz': (0, _XZ_MAGIC),
+    '.tar': (257, (b'ustar',)),
+    '.7z': (0, (b"7z\xbc\xaf\x27\x1c",)),
+}
+_ARCHIVE_MAGIC.update((ext, (0, _ZIP_MAGIC)) for ext in SPECIAL_EXTENSIONS | {'.zip'})
+PROBE_SIZE = 512
+# Zip names without the UTF-8 flag are usually cp866 on Russian Windows; the keyword
+# exists since Python 3.11, older versions keep the cp437 default
+_ZIP_KWARGS = {'metadata_encoding': 'cp866'} if sys.version_info >= (3, 11) else {}
+
+_local = threading.local()
+# Unique suffixes for _remove_later, together with the pid
+_TRASH_IDS = itertools.count()
+
+def _copy_buffer():
+    """Return this thread's reusable COPY_BUFSIZE buffer"""
+    buf = getattr(_local, 'buf', None)
+    if buf is None:
+        buf = _local.buf = memoryview(bytearray(COPY_BUFSIZE))
+    return buf
+
+def _probe_buffer():
+    """Return this thread's reusable PROBE_SIZE buffer for header sniffing"""
+    buf = getattr(_local, 'probe', None)
+    if buf is None:
+        buf = _local.probe = bytearray(PROBE_SIZE)
+    return buf
+
 class PaxoInsightApp:
     def __init__(self):
         # Initialize root window
@@ -77,6 +179,11 @@ class PaxoInsightApp:
         # State
         self.path = None
         self.extract_dir = None
+        # (exts, classes, specials) of the last analysis; save_report writes it without rescanning
+        self.last_result = None
+        self.analyze_only = None
+        # Errors raised in worker threads, shown by _drain_errors on the Tk thread
+        self.error_queue = queue.Queue()
         self.text_display = None
         self.class_count_label = None
         self.special_count_label = None
@@ -84,7 +191,13 @@ class PaxoInsightApp:
 
         # Build UI
         self._build_ui()
+        self.root.after(100, self._drain_errors)
         self.root.mainloop()
+        # Pending _remove_later deletes keep the process alive; close the window meanwhile
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
 
     def _build_ui(self):
         # Menu bar
@@ -105,20 +218,26 @@ class PaxoInsightApp:
         frame = tk.Frame(self.root, padx=10, pady=10)
         frame.pack(fill=tk.BOTH, expand=True)
 
-        # Drag-and-drop zone
-        drop_label = tk.Label(frame, text="Перетащите файл или папку сюда",
-                              relief=tk.RIDGE, height=3)
+        # Drag-and-drop zone; the label text is final at creation, no reconfigure
+        dnd = DND_BACKEND == 'tkdnd2'
+        drop_text = "Перетащите файл или папку сюда"
+        if not dnd:
+            drop_text += "\n(Установите TkinterDnD2 для DnD)"
+        drop_label = tk.Label(frame, text=drop_text, relief=tk.RIDGE, height=3)
         drop_label.pack(fill=tk.X, pady=(0,5))
-        if DND_BACKEND == 'tkdnd2':
+        if dnd:
             drop_label.drop_target_register(DND_FILES)
             drop_label.dnd_bind('<<Drop>>', self._handle_drop)
-        else:
-            drop_label.config(text="Перетащите файл или папку сюда\n(Установите TkinterDnD2 для DnD)")
 
         # Duplicate buttons
         tk.Button(frame, text="Выбрать файл", command=self.select_archive).pack(fill=tk.X, pady=(5,0))
         tk.Button(frame, text="Выбрать папку", command=self.select_folder).pack(fill=tk.X, pady=(0,5))
 
+        # List archive contents instead of extracting them
+        self.analyze_only = tk.BooleanVar(master=self.root, value=False)
+        tk.Checkbutton(frame, text="Только анализ (без распаковки)",
+                       variable=self.analyze_only).pack(anchor=tk.W)
+
         # Counters
         counter_frame = tk.Frame(frame)
         counter_frame.pack(fill=tk.X, pady=(5,5))
@@ -155,6 +274,16 @@ class PaxoInsightApp:
         # Save report button
         tk.Button(frame, text="Сохранить отчет", command=self.save_report).pack(fill=tk.X, pady=(5,0))
 
+    def _drain_errors(self):
+        """Show errors queued by worker threads; Tk may only be touched from this thread"""
+        while True:
+            try:
+                title, msg = self.error_queue.get_nowait()
+            except queue.Empty:
+                break
+            messagebox.showerror(title, msg)
+        self.root.after(100, self._drain_errors)
+
     def _show_about(self):
         messagebox.showinfo("О программе", f"PaxoInsight {VERSION}\nАвтор: {AUTHOR}")
 
@@ -174,47 +303,36 @@ class PaxoInsightApp:
             self._process_path(folder)
 
     def _get_extension(self, path):
-        """Return the longest matching extension, checking all except '.gz' first, then '.gz' last."""
-        lp = path.lower()
-        # Combine supported and special extensions
-        exts = list(SUPPORTED_FORMATS.keys()) + list(SPECIAL_EXTENSIONS)
-        # Sort by length descending, excluding '.gz'
-        exts = [e for e in exts if e != '.gz']
-        exts.sort(key=len, reverse=True)
-        # Check all except pure '.gz'
-        for ext in exts:
-            if lp.endswith(ext):
-                return ext
-        # Finally, check '.gz' if nothing else matched
-        if lp.endswith('.gz'):
-            return '.gz'
-        # Fallback to simple splitext
-        return os.path.splitext(path)[1].lower()
+        """Return the longest matching known extension ('.tar.gz' wins over '.gz'), else splitext."""
+        return _suffix(path)
 
     def _process_path(self, path):
         self.status_label.config(text="Обработка...")
         self.path = path
+        self.last_result = None
         if os.path.isdir(path):
             self.extract_dir = path
-            formats, classes, specials = self._scan_disk(path)
-            self._update_display(formats, classes, specials, unpacked=set())
-            self.status_label.config(text="Анализ завершён успешно")
+            thread = threading.Thread(target=self._scan_and_update, args=(path,), daemon=True)
+            thread.start()
+        elif self.analyze_only.get():
+            self.extract_dir = None
+            thread = threading.Thread(target=self._list_and_show, daemon=True)
+            thread.start()
         else:
             self.extract_dir = self._compute_extract_dir(path)
             thread = threading.Thread(target=self._extract_and_list, daemon=True)
             thread.start()
 
     def _compute_extract_dir(self, path):
-        lp = path.lower()
-        for ext in sorted(SUPPORTED_FORMATS.keys(), key=len, reverse=True):
-            if lp.endswith(ext):
-                return path[:-len(ext)] + "_extracted"
+        ext = _match_extension(path.lower())
+        if ext in SUPPORTED_FORMATS:
+            return path[:-len(ext)] + "_extracted"
         return os.path.splitext(path)[0] + "_extracted"
 
     def _extract_and_list(self):
         """Extract archive and recursively unpack inner archives"""
         try:
-            if os.path.isdir(self.extract_dir): shutil.rmtree(self.extract_dir)
+            if os.path.isdir(self.extract_dir): self._remove_later(self.extract_dir)
             os.makedirs(self.extract_dir)
 
             ext = self._get_extension(self.path)
@@ -225,151 +343,466 @@ class PaxoInsightApp:
             elif ext == '.gz':
                 gz_name = os.path.splitext(os.path.basename(self.path))[0]
                 target = os.path.join(self.extract_dir, gz_name)
-                with gzip.open(self.path, 'rb') as f_in, open(target, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+                self._extract_gz(self.path, target)
             # zip-like
-            elif ext in SPECIAL_EXTENSIONS:
-                zf = self._open_zip(self.path); zf.extractall(self.extract_dir); zf.close()
-            elif ext in SUPPORTED_FORMATS and ext != '.7z':
-                if ext.startswith('.tar'):
-                    self._extract_tar(self.path, self.extract_dir)
-                else:
-                    shutil.unpack_archive(self.path, self.extract_dir)
+            elif ext in SPECIAL_EXTENSIONS or ext == '.zip':
+                self._extract_zip_stream(self.path, self.extract_dir)
+            elif ext in SUPPORTED_FORMATS:
+                self._extract_tar(self.path, self.extract_dir)
             else:
                 raise ValueError(f"Неподдерживаемый формат: {ext}")
-            os.remove(self.path)
+            self._remove_later(self.path)
 
             unpacked = set()
-            self._recursive_unpack(self.extract_dir, 0, unpacked)
+            self.last_result = self._unpack_and_scan(self.extract_dir, 0, unpacked)
+            self._show_result(*self.last_result, unpacked, "Распаковка завершена успешно")
+        except Exception as e:
+            self._show_error(e)
 
-            formats, classes, specials = self._scan_disk(self.extract_dir)
-            self.root.after(0, self._update_display, formats, classes, specials, unpacked)
-            self.root.after(0, lambda: self.status_label.config(text="Распаковка завершена успешно"))
+    def _scan_and_update(self, path):
+        """Scan a folder off the Tk thread and show the result"""
+        try:
+            self.last_result = self._scan_disk(path)
+            self._show_result(*self.last_result, set(), "Анализ завершён успешно")
         except Exception as e:
-            self.root.after(0, lambda: [self.status_label.config(text=f"Ошибка: {e}"), messagebox.showerror("Ошибка", str(e))])
+            self._show_error(e)
 
-    def _open_zip(self, path):
+    def _list_and_show(self):
+        """List archive contents without extracting and show them"""
+        try:
+            self.last_result = self._list_archive(self.path)
+            self._show_result(*self.last_result, set(), "Анализ завершён успешно")
+        except Exception as e:
+            self._show_error(e)
+
+    def _list_archive(self, path):
+        """Return (exts, classes, specials) from the top-level archive index, without extracting"""
+        exts, classes, specials = set(), [], []
+        for rel in self._iter_archive_names(path):
+            parts = rel.replace('\\', '/').split('/')
+            if '__MACOSX' in parts or parts[-1].startswith('._'): continue
+            e = _suffix(parts[-1])
+            if e == CLASS_EXTENSION: classes.append(rel)
+            elif e in _SPECIALS_OR_GZ: specials.append((rel, e))
+            if e: exts.add(e)
+        classes.sort()
+        specials.sort()
+        return exts, classes, specials
+
+    def _iter_archive_names(self, path):
+        """Yield the file member names of an archive one at a time"""
+        ext = self._get_extension(path)
+        if ext == '.7z':
+            with py7zr.SevenZipFile(path, mode='r') as archive:
+                for f in archive.list():
+                    if not f.is_directory:
+                        yield f.filename
+        elif ext == '.gz':
+            yield os.path.splitext(os.path.basename(path))[0]
+        elif ext in SPECIAL_EXTENSIONS or ext == '.zip':
+            with self._open_zip(path) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        yield info.filename
+        elif ext in SUPPORTED_FORMATS:
+            import tarfile
+            with tarfile.open(path, 'r|*') as tf:
+                for m in tf:
+                    if not m.isdir():
+                        yield m.name
+        else:
+            raise ValueError(f"Неподдерживаемый формат: {ext}")
+
+    def _show_result(self, formats, classes, specials, unpacked, status):
+        """Format results on the worker thread and apply them via _flush_ui on the Tk thread"""
+        state = self._format_results(formats, classes, specials, unpacked)
+        state['status'] = status
+        self.root.after_idle(self._flush_ui, state)
+
+    def _show_error(self, e):
+        msg = str(e)
+
+        def _fail():
+            self.status_label.config(text=f"Ошибка: {msg}")
+            messagebox.showerror("Ошибка", msg)
+        self.root.after_idle(_fail)
+
+    def _remove_later(self, path):
+        """Rename a file or directory to a hidden ._*.del name and delete it on a background thread"""
+        head, tail = os.path.split(path)
+        trash = os.path.join(head, f"._{tail}.{os.getpid()}.{next(_TRASH_IDS)}.del")
         try:
-            return zipfile.ZipFile(path, 'r', encoding='cp866')
-        except TypeError:
-            return zipfile.ZipFile(path, 'r')
+            os.replace(path, trash)
+        except OSError:
+            self._remove_now(path, ignore_errors=False)
+            return
+        threading.Thread(target=self._remove_now, args=(trash,)).start()
+
+    def _remove_now(self, path, ignore_errors=True):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=ignore_errors)
+            else:
+                os.remove(path)
+        except OSError:
+            if not ignore_errors:
+                raise
+
+    def _advise_sequential(self, fp):
+        """Hint the kernel that the open archive fp is read front to back (POSIX only)"""
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            fd = fp.fileno()
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, READAHEAD, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+    @contextlib.contextmanager
+    def _open_zip(self, path):
+        """Open a zip-family archive over one COPY_BUFSIZE-buffered file handle"""
+        import zipfile
+        with open(path, 'rb', buffering=COPY_BUFSIZE) as fp:
+            self._advise_sequential(fp)
+            with zipfile.ZipFile(fp, 'r', allowZip64=True, **_ZIP_KWARGS) as zf:
+                yield zf
+
+    def _extract_zip_stream(self, path, dest):
+        """Extract a zip-family archive member by member, cleaning names like ZipFile.extract"""
+        with self._open_zip(path) as zf:
+            dirs, files = {dest}, []
+            for info in sorted(zf.infolist(), key=lambda i: i.header_offset):
+                name = info.filename.replace('/', os.sep)
+                if os.altsep:
+                    name = name.replace(os.altsep, os.sep)
+                parts = [p for p in os.path.splitdrive(name)[1].split(os.sep)
+                         if p not in ('', os.curdir, os.pardir)]
+                if os.name == 'nt':
+                    parts = [p for p in (p.translate(_WIN_ILLEGAL).rstrip('.') for p in parts) if p]
+                if not parts:
+                    continue
+                target = os.path.join(dest, *parts)
+                if info.is_dir():
+                    dirs.add(target)
+                else:
+                    dirs.add(os.path.dirname(target))
+                    files.append((info, target))
+            for d in sorted(dirs):
+                os.makedirs(d, exist_ok=True)
+            for info, target in files:
+                with zf.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+
+    def _extract_gz(self, path, target):
+        """Decompress a raw .gz file in COPY_BUFSIZE chunks"""
+        with open(path, 'rb') as raw, gzip.GzipFile(fileobj=raw) as f_in, open(target, 'wb') as f_out:
+            self._advise_sequential(raw)
+            shutil.copyfileobj(f_in, f_out, COPY_BUFSIZE)
 
     def _extract_tar(self, path, dest):
         """Extract tar archives with any compression"""
         try:
+            if self._extract_tar_native(path, dest):
+                return
+        except subprocess.CalledProcessError:
+            pass
+        if libarchive is not None:
+            try:
+                self._extract_libarchive(path, dest)
+                return
+            except libarchive.ArchiveError:
+                pass
+        import tarfile
+        try:
+            with open(path, 'rb') as fp:
+                self._advise_sequential(fp)
+                with tarfile.open(fileobj=fp, mode='r|*') as tf:
+                    self._extract_tar_members(tf, dest)
+        except tarfile.StreamError:
+            # Some members need random access; redo it on a seekable handle
             with tarfile.open(path, 'r:*') as tf:
-                tf.extractall(dest)
-        except Exception:
-            with tarfile.open(path, 'r') as tf:
-                tf.extractall(dest)
+                self._extract_tar_members(tf, dest)
+
+    def _extract_libarchive(self, path, dest):
+        """Extract with libarchive-c, writing file data block by block"""
+        root = os.path.realpath(dest)
+        os.makedirs(root, exist_ok=True)
+        with libarchive.file_reader(path) as archive:
+            for entry in archive:
+                target = os.path.realpath(os.path.join(root, entry.pathname))
+                if os.path.commonpath([root, target]) != root:
+                    raise ValueError(f"Небезопасный путь в архиве: {entry.pathname}")
+                if entry.isdir:
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if entry.isfile:
+                    with open(target, 'wb') as dst:
+                        for block in entry.get_blocks(COPY_BUFSIZE):
+                            dst.write(block)
+                elif entry.issym or entry.islnk:
+                    # A link leaving root would let a later member write through it
+                    linkpath = entry.linkpath
+                    if entry.issym:
+                        source = os.path.join(os.path.dirname(target), linkpath)
+                    else:
+                        source = os.path.join(root, linkpath)
+                    source = os.path.realpath(source)
+                    if os.path.isabs(linkpath) or os.path.commonpath([root, source]) != root:
+                        raise ValueError(f"Небезопасная ссылка в архиве: {entry.pathname} -> {linkpath}")
+                    # Links are best effort, as on Windows without symlink rights
+                    try:
+                        if entry.issym:
+                            os.symlink(linkpath, target)
+                        else:
+                            os.link(source, target)
+                    except OSError:
+                        pass
+
+    def _extract_tar_members(self, tf, dest):
+        """Extract members in stored order without restoring modes or times"""
+        import tarfile
+        # The 'data' filter (3.12, backported to 3.8.17+) also refuses links leaving dest
+        extract_kw = {'set_attrs': False}
+        if hasattr(tarfile, 'data_filter'):
+            extract_kw['filter'] = 'data'
+        root = os.path.realpath(dest)
+        buf = _copy_buffer()
+        for m in tf:
+            target = os.path.realpath(os.path.join(root, m.name))
+            if os.path.commonpath([root, target]) != root:
+                raise ValueError(f"Небезопасный путь в архиве: {m.name}")
+            if m.issym() or m.islnk():
+                # A link leaving root would let a later member write through it
+                base = os.path.dirname(target) if m.issym() else root
+                source = os.path.realpath(os.path.join(base, m.linkname))
+                if os.path.isabs(m.linkname) or os.path.commonpath([root, source]) != root:
+                    raise ValueError(f"Небезопасная ссылка в архиве: {m.name} -> {m.linkname}")
+            if not m.isfile():
+                tf.extract(m, root, **extract_kw)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with tf.extractfile(m) as src, open(target, 'wb') as dst:
+                n = src.readinto(buf)
+                while n:
+                    dst.write(buf[:n])
+                    n = src.readinto(buf)
+
+    def _extract_tar_native(self, path, dest):
+        """Extract via native tar with a parallel decompressor; return False when the tools are missing"""
+        candidates = _NATIVE_DECOMPRESSORS.get(self._get_extension(path), ())
+        program = next((_NATIVE[name] for name in candidates if _NATIVE[name]), None)
+        if not (_NATIVE['tar'] and program):
+            return False
+        os.makedirs(dest, exist_ok=True)
+        # tar itself refuses absolute and '..' members; a non-zero exit falls back to tarfile
+        subprocess.run([_NATIVE['tar'], f'--use-compress-program={program}', '-xf', path, '-C', dest],
+                       check=True, stdin=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return True
 
     def _extract_7z(self, path, dest):
         """Extract a .7z archive using py7zr library"""
+        with py7zr.SevenZipFile(path, mode='r') as archive:
+            archive.extractall(path=dest)
+
+    def _unpack_and_scan(self, directory, depth, unpacked):
+        """Unpack inner archives up to MAX_DEPTH on a thread pool and catalogue the resulting tree"""
+        base_len = len(os.path.join(directory, ''))
+        exts, classes, specials = set(), [], []
+        seen = set()
+
+        def catalogue(files):
+            for full, ext in files:
+                rel = full[base_len:]
+                if rel in seen: continue
+                seen.add(rel)
+                if ext == CLASS_EXTENSION: classes.append(rel)
+                elif ext in _SPECIALS_OR_GZ: specials.append((rel, ext))
+                if ext: exts.add(ext)
+
+        # Each archive path is claimed once, so no archive (7z or otherwise) is ever reopened
+        claimed = set()
+        pending = {}
+        failures = []
+        jobs, files = self._find_archives(directory, depth)
+        catalogue(files)
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            while True:
+                for full, iext, d in jobs:
+                    if full not in claimed:
+                        claimed.add(full)
+                        pending[pool.submit(self._unpack_inner, full, iext, d)] = (full, iext)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                jobs = []
+                for fut in done:
+                    full, iext = pending.pop(fut)
+                    error, children, files = fut.result()
+                    if error is None:
+                        unpacked.add(iext)
+                        jobs.extend(children)
+                        catalogue(files)
+                    else:
+                        # Left in place with any partial output, both part of the tree as plain files
+                        catalogue([(full, iext)])
+                        catalogue(files)
+                        failures.append(f"{full[base_len:]}: {error}")
+        # Jobs finish in a different order on every run; sort so display and report are reproducible
+        classes.sort()
+        specials.sort()
+        if failures:
+            failures.sort()
+            shown = "\n".join(failures[:10])
+            more = f"\n… и ещё {len(failures) - 10}" if len(failures) > 10 else ""
+            self.error_queue.put(("Вложенные архивы",
+                                  f"Не удалось распаковать {len(failures)}:\n{shown}{more}"))
+        return exts, classes, specials
+
+    def _find_archives(self, path, depth):
+        """Split files at path into inner archives (full, ext, depth) and files to keep (full, ext)"""
+        if os.path.isfile(path):
+            files = [(path, os.path.basename(path), '')]
+        else:
+            files = self._iter_files(path)
+        archives, kept = [], []
+        suffix = _suffix
+        for full, name, _ in files:
+            # Extensions never span a separator, so the bare name classifies the file
+            iext = suffix(name)
+            if depth < MAX_DEPTH and iext in _UNPACKABLE and self._has_archive_magic(full, iext):
+                archives.append((full, iext, depth))
+            else:
+                kept.append((full, iext))
+        return archives, kept
+
+    def _has_archive_magic(self, path, ext):
+        """Return whether the file starts with the header magic expected for ext"""
+        offset, magics = _ARCHIVE_MAGIC[ext]
+        buf = _probe_buffer()
         try:
-            with py7zr.SevenZipFile(path, mode='r') as archive:
-                archive.extractall(path=dest)
+            with open(path, 'rb', buffering=0) as fp:
+                n = fp.readinto(buf)
+        except OSError:
+            return False
+        return buf[offset:n].startswith(magics)
+
+    def _unpack_inner(self, full, iext, depth):
+        """Extract one inner archive next to itself; return (error or None, archives, kept files)"""
+        target = full[:-len(iext)]
+        try:
+            if iext == '.gz':
+                self._extract_gz(full, target)
+            elif iext == '.7z':
+                self._extract_7z(full, target)
+            elif iext in SPECIAL_EXTENSIONS or iext == '.zip':
+                self._extract_zip_stream(full, target)
+            else:
+                self._extract_tar(full, target)
+            self._remove_later(full)
         except Exception as e:
-            messagebox.showerror("Ошибка 7z", f"Не удалось распаковать {path}: {e}")
+            # At MAX_DEPTH nothing is treated as an archive, so partial output is listed as is
+            return (str(e) or type(e).__name__,) + self._find_archives(target, MAX_DEPTH)
+        return (None,) + self._find_archives(target, depth + 1)
 
-    def _recursive_unpack(self, directory, depth, unpacked):
-        """Recursively unpack inner archives up to MAX_DEPTH"""
-        if depth >= MAX_DEPTH:
-            return
-        for root, _, files in os.walk(directory):
-            if '__MACOSX' in root:
-                continue
-            for f in files:
-                if f.startswith('._'):
-                    continue
-                full = os.path.join(root, f)
-                iext = self._get_extension(full)
-                try:
-                    if iext == '.gz':
-                        gz_name = os.path.splitext(f)[0]
-                        target = os.path.join(root, gz_name)
-                        with gzip.open(full, 'rb') as f_in, open(target, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                        unpacked.add(iext)
-                        os.remove(full)
-                        self._recursive_unpack(root, depth+1, unpacked)
-                    elif iext == '.7z':
-                        target = full[:-len(iext)]
-                        self._extract_7z(full, target)
-                        unpacked.add(iext)
-                        os.remove(full)
-                        self._recursive_unpack(target, depth+1, unpacked)
-                    elif iext in SPECIAL_EXTENSIONS:
-                        target = full[:-len(iext)]
-                        zf = self._open_zip(full)
-                        zf.extractall(target)
-                        zf.close()
-                        unpacked.add(iext)
-                        os.remove(full)
-                        self._recursive_unpack(target, depth+1, unpacked)
-                    elif iext in SUPPORTED_FORMATS:
-                        target = full[:-len(iext)]
-                        if iext.startswith('.tar'):
-                            self._extract_tar(full, target)
-                        else:
-                            shutil.unpack_archive(full, target)
-                        unpacked.add(iext)
-                        os.remove(full)
-                        self._recursive_unpack(target, depth+1, unpacked)
-                except Exception:
-                    continue
+    def _list_dir(self, path):
+        """Return the DirEntry list of path, in inode order where that saves disk seeks"""
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return []
+        if INODE_ORDER:
+            entries.sort(key=os.DirEntry.inode)
+        return entries
+
+    def _iter_files(self, directory):
+        """Yield (path, name, prefix) for every file under directory, skipping __MACOSX, '._' and pending deletes"""
+        work = deque([(directory, '')])
+        while work:
+            path, prefix = work.popleft()
+            for entry in self._list_dir(path):
+                name = entry.name
+                if entry.is_dir():
+                    if (name != '__MACOSX' and not entry.is_symlink()
+                            and not (name.startswith('._') and name.endswith('.del'))):
+                        work.append((entry.path, prefix + name + os.sep))
+                elif not name.startswith('._'):
+                    yield entry.path, name, prefix
 
     def _scan_disk(self, directory):
+        """Collect extensions, .class files and special files, as (rel, ext), under directory"""
         exts, classes, specials = set(), [], []
-        for root, _, files in os.walk(directory):
-            if '__MACOSX' in root: continue
-            for f in files:
-                if f.startswith('._'): continue
-                rel = os.path.relpath(os.path.join(root, f), directory)
-                le = f.lower()
-                if le.endswith(CLASS_EXTENSION): classes.append(rel)
-                ext = self._get_extension(rel)
-                if ext in SPECIAL_EXTENSIONS or ext == '.gz': specials.append(rel)
-                if ext: exts.add(ext)
+        suffix = _suffix
+        for _, name, prefix in self._iter_files(directory):
+            ext = suffix(name)
+            if ext: exts.add(ext)
+            # A name is a class or a special file, never both; build rel only for those
+            if ext == CLASS_EXTENSION: classes.append(prefix + name)
+            elif ext in _SPECIALS_OR_GZ: specials.append((prefix + name, ext))
+        # Listing is breadth-first and inode-ordered; sort so entries group by directory
+        classes.sort()
+        specials.sort()
         return exts, classes, specials
 
-    def _update_display(self, formats, classes, specials, unpacked):
-        # Update counters
-        self.class_count_label.config(text=f"Классов: {len(classes)}")
-        self.special_count_label.config(text=f"Спец. файлов: {len(specials)}")
-        # Update text area
-        self.text_display.delete('1.0', tk.END)
+    def _format_results(self, formats, classes, specials, unpacked):
+        """Build the counter and text-area contents without touching Tk (safe off the main thread)"""
+        # Hot loops use local aliases to skip repeated attribute lookups
+        lines = []
+        add = lines.append
         if classes:
-            self.text_display.insert(tk.END, "Обнаружены .class-файлы:\n")
-            for c in classes:
-                self.text_display.insert(tk.END, f"  {c}\n")
-            self.text_display.insert(tk.END, "\n")
+            add("Обнаружены .class-файлы:\n")
+            lines.extend(f"  {c}\n" for c in classes)
+            add("\n")
         if specials:
-            self.text_display.insert(tk.END, "Сборка кода/приложения:\n")
-            for s in specials:
-                tag = " (распакован)" if os.path.splitext(s)[1].lower() in unpacked else ""
-                self.text_display.insert(tk.END, f"  {s}{tag}\n")
-            self.text_display.insert(tk.END, "\n")
-        others = sorted(formats - {os.path.splitext(x)[1].lower() for x in classes+specials})
+            add("Сборка кода/приложения:\n")
+            for s, ext in specials:
+                tag = " (распакован)" if ext in unpacked else ""
+                add(f"  {s}{tag}\n")
+            add("\n")
+        # Extensions were lowered once by the scan; reuse them instead of re-splitting names
+        shown = {ext for _, ext in specials}
+        if classes: shown.add(CLASS_EXTENSION)
+        others = sorted(formats - shown)
         if others:
-            self.text_display.insert(tk.END, "Обнаруженные форматы:\n")
+            add("Обнаруженные форматы:\n")
             for ext in others:
                 tags = []
                 if ext in SPECIAL_EXTENSIONS: tags.append("спец.")
                 if ext in unpacked: tags.append("распакован")
                 tag_str = f" ({'; '.join(tags)})" if tags else ""
-                self.text_display.insert(tk.END, f"  {ext}{tag_str}\n")
+                add(f"  {ext}{tag_str}\n")
+        return {'classes': len(classes), 'specials': len(specials), 'text': "".join(lines)}
+
+    def _flush_ui(self, state):
+        """Apply formatted results to the widgets in one go; Tk thread only"""
+        self.class_count_label.config(text=f"Классов: {state['classes']}")
+        self.special_count_label.config(text=f"Спец. файлов: {state['specials']}")
+        # One Tk insert for the whole text instead of one per line
+        text = self.text_display
+        text.config(state='normal')
+        text.delete('1.0', tk.END)
+        text.insert('1.0', state['text'])
+        text.config(state='disabled')
+        if 'status' in state:
+            self.status_label.config(text=state['status'])
+        text.update_idletasks()
 
     def save_report(self):
-        if not self.extract_dir or not os.path.isdir(self.extract_dir):
+        if self.last_result is None and (not self.extract_dir or not os.path.isdir(self.extract_dir)):
             messagebox.showwarning("Внимание", "Сначала распакируйте или анализируйте путь")
             return
         rpt = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[('Text files','*.txt')], title='Сохранить отчет')
         if not rpt: return
-        exts, classes, specials = self._scan_disk(self.extract_dir)
-        with open(rpt, 'w', encoding='utf-8') as rf:
+        if self.last_result is not None:
+            exts, classes, specials = self.last_result
+        else:
+            exts, classes, specials = self._scan_disk(self.extract_dir)
+        with open(rpt, 'w', encoding='utf-8', buffering=COPY_BUFSIZE) as rf:
             rf.write("Отчет по файлам форматов: " + ", ".join(sorted(REPORT_EXTENSIONS)) + "\n\n")
             for c in classes: rf.write(f"{c} -> {CLASS_EXTENSION}\n")
-            for s in specials: rf.write(f"{s} -> {os.path.splitext(s)[1].lower()}\n")
+            for s, ext in specials: rf.write(f"{s} -> {ext}\n")
             for ext in sorted(exts):
                 if ext not in REPORT_EXTENSIONS:
                     rf.write(f"* -> {ext}\n")